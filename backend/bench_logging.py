@@ -0,0 +1,80 @@
+"""
+Benchmark logging overhead per request.
+
+Compares the old synchronous FileHandler setup with the queue-based setup from
+logging_config.py. Each simulated request emits the same records as /chat.
+
+Usage: python bench_logging.py [requests]
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import logging_config
+
+QUESTION = "Người lao động làm thêm giờ tối đa bao nhiêu giờ mỗi tháng? " * 2
+
+# (message, args, extra) as logged by main.py
+RECORDS_PER_REQUEST = [
+    ("Search query: %.100s...", (QUESTION,), {"sampled": True}),
+    ("Question analysis: situational=%s, concepts=%s", (True, ["làm thêm giờ"]), {"sampled": True}),
+    ("%s %s completed", ("POST", "/chat"), {"timings": {"analysis": 850.0, "vector_search": 310.0}}),
+]
+
+
+def _run(logger, requests):
+    start = time.perf_counter()
+    for i in range(requests):
+        token = logging_config.request_id_var.set(f"bench-{i}")
+        for message, args, extra in RECORDS_PER_REQUEST:
+            logger.info(message, *args, extra=extra)
+        logging_config.request_id_var.reset(token)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def bench_sync(path, requests):
+    """Old setup: basicConfig with a FileHandler on the request thread"""
+    root = logging.getLogger()
+    root.handlers.clear()
+    handler = logging.FileHandler(path, encoding='utf-8')
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+    try:
+        return _run(logging.getLogger("bench"), requests)
+    finally:
+        root.removeHandler(handler)
+        handler.close()
+
+
+def bench_queue(path, requests, sample_rate):
+    """New setup: QueueHandler on the request thread, file writes on the listener thread"""
+    logging_config.LOG_FILE = path
+    logging_config.LOG_SAMPLE_RATE = sample_rate
+    logging_config.setup_logging()
+    root = logging.getLogger()
+    # Keep the console out of the measurement
+    for handler in logging_config._listener.handlers:
+        if isinstance(handler, logging.StreamHandler) and handler.stream is sys.stdout:
+            handler.setLevel(logging.CRITICAL)
+    try:
+        return _run(logging.getLogger("bench"), requests)
+    finally:
+        logging_config.shutdown_logging()
+        root.handlers.clear()
+
+
+if __name__ == "__main__":
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    sample_rate = logging_config.LOG_SAMPLE_RATE
+    with tempfile.TemporaryDirectory() as tmp:
+        sync_us = bench_sync(os.path.join(tmp, "sync.log"), requests)
+        # Same records as the sync run, so the two numbers are comparable
+        full_us = bench_queue(os.path.join(tmp, "queue_full.log"), requests, 1.0)
+        sampled_us = bench_queue(os.path.join(tmp, "queue_sampled.log"), requests, sample_rate)
+    print(f"requests: {requests}")
+    print(f"sync FileHandler: {sync_us:.1f} us/request")
+    print(f"queue + JSON (sample rate 1.0): {full_us:.1f} us/request")
+    print(f"queue + JSON (sample rate {sample_rate}): {sampled_us:.1f} us/request")
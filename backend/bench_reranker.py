@@ -0,0 +1,185 @@
+"""
+Benchmark reranker latency and recall on labelled labour-law questions.
+
+Candidate pools have the production over-fetch size (RERANK_FETCH_K): the
+RERANK_FETCH_K passages of the corpus closest to the question by TF-IDF, with
+the relevant Điều forced in. Embeddings need the Gemini API, so TF-IDF cosine
+order stands in for the vector ranking. Every question comes with the graph
+triples structured_retriever would return, including a generic one, so the
+graph-fusion path is exercised.
+
+The hard questions are paraphrases with little word overlap with their Điều.
+Recall@1 and recall@N are reported for the vector order, reranking without
+graph entities, and reranking with them.
+
+Usage: python bench_reranker.py [rounds]
+"""
+import sys
+import time
+
+import numpy as np
+
+from config import RETRIEVAL_K, RERANK_FETCH_K
+from reranker import rerank, tokenize
+
+PASSAGES = {
+    "Điều 25": "Điều 25. Thời gian thử việc. Thời gian thử việc do hai bên thỏa thuận căn cứ vào tính chất và mức độ phức tạp của công việc nhưng chỉ được thử việc một lần đối với một công việc: không quá 180 ngày đối với công việc của người quản lý doanh nghiệp; không quá 60 ngày đối với công việc có chức danh nghề nghiệp cần trình độ chuyên môn, kỹ thuật từ cao đẳng trở lên; không quá 30 ngày đối với trình độ trung cấp; không quá 06 ngày làm việc đối với công việc khác.",
+    "Điều 26": "Điều 26. Tiền lương thử việc. Tiền lương của người lao động trong thời gian thử việc do hai bên thỏa thuận nhưng ít nhất phải bằng 85% mức lương của công việc đó.",
+    "Điều 35": "Điều 35. Quyền đơn phương chấm dứt hợp đồng lao động của người lao động. Người lao động có quyền đơn phương chấm dứt hợp đồng lao động nhưng phải báo trước cho người sử dụng lao động ít nhất 45 ngày nếu làm việc theo hợp đồng lao động không xác định thời hạn; ít nhất 30 ngày nếu hợp đồng có thời hạn từ 12 tháng đến 36 tháng; ít nhất 03 ngày làm việc nếu hợp đồng có thời hạn dưới 12 tháng.",
+    "Điều 46": "Điều 46. Trợ cấp thôi việc. Khi hợp đồng lao động chấm dứt, người sử dụng lao động có trách nhiệm trả trợ cấp thôi việc cho người lao động đã làm việc thường xuyên từ đủ 12 tháng trở lên, mỗi năm làm việc được trợ cấp một nửa tháng tiền lương.",
+    "Điều 98": "Điều 98. Tiền lương làm thêm giờ, làm việc vào ban đêm. Người lao động làm thêm giờ được trả lương tính theo đơn giá tiền lương hoặc tiền lương thực trả theo công việc đang làm: vào ngày thường ít nhất bằng 150%; vào ngày nghỉ hằng tuần ít nhất bằng 200%; vào ngày nghỉ lễ, tết, ngày nghỉ có hưởng lương ít nhất bằng 300%.",
+    "Điều 105": "Điều 105. Thời giờ làm việc bình thường. Thời giờ làm việc bình thường không quá 08 giờ trong 01 ngày và không quá 48 giờ trong 01 tuần. Người sử dụng lao động có quyền quy định thời giờ làm việc theo ngày hoặc tuần.",
+    "Điều 107": "Điều 107. Làm thêm giờ. Người sử dụng lao động phải bảo đảm số giờ làm thêm của người lao động không quá 50% số giờ làm việc bình thường trong 01 ngày; không quá 40 giờ trong 01 tháng; không quá 200 giờ trong 01 năm.",
+    "Điều 109": "Điều 109. Nghỉ trong giờ làm việc. Người lao động làm việc theo thời giờ làm việc bình thường từ 06 giờ trở lên trong một ngày thì được nghỉ giữa giờ ít nhất 30 phút liên tục, làm việc vào ban đêm thì được nghỉ giữa giờ ít nhất 45 phút liên tục.",
+    "Điều 112": "Điều 112. Nghỉ lễ, tết. Người lao động được nghỉ làm việc, hưởng nguyên lương trong những ngày lễ, tết: Tết Dương lịch 01 ngày; Tết Âm lịch 05 ngày; Ngày Chiến thắng 01 ngày; Ngày Quốc tế lao động 01 ngày; Quốc khánh 02 ngày; Ngày Giỗ Tổ Hùng Vương 01 ngày.",
+    "Điều 113": "Điều 113. Nghỉ hằng năm. Người lao động làm việc đủ 12 tháng cho một người sử dụng lao động thì được nghỉ hằng năm, hưởng nguyên lương theo hợp đồng lao động: 12 ngày làm việc đối với người làm công việc trong điều kiện bình thường.",
+    "Điều 125": "Điều 125. Hình thức xử lý kỷ luật lao động. Khiển trách; kéo dài thời hạn nâng lương không quá 06 tháng; cách chức; sa thải.",
+    "Điều 139": "Điều 139. Nghỉ thai sản. Lao động nữ được nghỉ thai sản trước và sau khi sinh con là 06 tháng; thời gian nghỉ trước khi sinh tối đa không quá 02 tháng.",
+    "Điều 14": "Điều 14. Hình thức hợp đồng lao động. Hợp đồng lao động phải được giao kết bằng văn bản và được làm thành 02 bản, người lao động giữ 01 bản, người sử dụng lao động giữ 01 bản. Hai bên có thể giao kết hợp đồng lao động bằng lời nói đối với hợp đồng có thời hạn dưới 01 tháng.",
+    "Điều 20": "Điều 20. Loại hợp đồng lao động. Hợp đồng lao động phải được giao kết theo một trong các loại sau đây: hợp đồng lao động không xác định thời hạn; hợp đồng lao động xác định thời hạn, trong đó hai bên xác định thời hạn, thời điểm chấm dứt hiệu lực của hợp đồng trong thời gian không quá 36 tháng.",
+    "Điều 36": "Điều 36. Quyền đơn phương chấm dứt hợp đồng lao động của người sử dụng lao động. Người sử dụng lao động có quyền đơn phương chấm dứt hợp đồng lao động khi người lao động thường xuyên không hoàn thành công việc theo hợp đồng; người lao động bị ốm đau, tai nạn đã điều trị 12 tháng liên tục đối với hợp đồng không xác định thời hạn mà khả năng lao động chưa hồi phục.",
+    "Điều 90": "Điều 90. Tiền lương. Tiền lương là số tiền mà người sử dụng lao động trả cho người lao động theo thỏa thuận để thực hiện công việc, bao gồm mức lương theo công việc hoặc chức danh, phụ cấp lương và các khoản bổ sung khác.",
+    "Điều 91": "Điều 91. Mức lương tối thiểu. Mức lương tối thiểu là mức lương thấp nhất được trả cho người lao động làm công việc giản đơn nhất trong điều kiện lao động bình thường, được xác lập theo vùng, ấn định theo tháng, giờ.",
+    "Điều 97": "Điều 97. Kỳ hạn trả lương. Người lao động hưởng lương theo giờ, ngày, tuần thì được trả lương sau giờ, ngày, tuần làm việc; người lao động hưởng lương theo tháng được trả lương mỗi tháng một lần hoặc nửa tháng một lần.",
+    "Điều 106": "Điều 106. Giờ làm việc ban đêm. Giờ làm việc ban đêm được tính từ 22 giờ đến 06 giờ sáng ngày hôm sau.",
+    "Điều 111": "Điều 111. Nghỉ hằng tuần. Mỗi tuần, người lao động được nghỉ ít nhất 24 giờ liên tục. Người sử dụng lao động có quyền quyết định sắp xếp ngày nghỉ hằng tuần vào ngày Chủ nhật hoặc ngày xác định khác trong tuần.",
+    "Điều 115": "Điều 115. Nghỉ việc riêng, nghỉ không hưởng lương. Người lao động được nghỉ việc riêng mà vẫn hưởng nguyên lương: kết hôn nghỉ 03 ngày; con đẻ, con nuôi kết hôn nghỉ 01 ngày; cha đẻ, mẹ đẻ, cha nuôi, mẹ nuôi chết nghỉ 03 ngày.",
+    "Điều 128": "Điều 128. Tạm đình chỉ công việc. Thời hạn tạm đình chỉ công việc không được quá 15 ngày, trường hợp đặc biệt không được quá 90 ngày. Trong thời gian bị tạm đình chỉ công việc, người lao động được tạm ứng 50% tiền lương trước khi bị đình chỉ công việc.",
+    "Điều 129": "Điều 129. Bồi thường thiệt hại. Người lao động làm hư hỏng dụng cụ, thiết bị hoặc có hành vi khác gây thiệt hại tài sản của người sử dụng lao động thì phải bồi thường; trường hợp do sơ suất với giá trị không quá 10 tháng lương tối thiểu vùng thì phải bồi thường nhiều nhất 03 tháng tiền lương và bị khấu trừ hằng tháng vào lương.",
+    "Điều 137": "Điều 137. Bảo vệ thai sản. Người sử dụng lao động không được sử dụng lao động nữ mang thai từ tháng thứ 07 làm việc ban đêm, làm thêm giờ và đi công tác xa; không được sa thải hoặc đơn phương chấm dứt hợp đồng lao động vì lý do kết hôn, mang thai, nghỉ thai sản, nuôi con dưới 12 tháng tuổi.",
+    "Điều 143": "Điều 143. Lao động chưa thành niên. Người lao động chưa thành niên là người lao động chưa đủ 18 tuổi.",
+    "Điều 169": "Điều 169. Tuổi nghỉ hưu. Tuổi nghỉ hưu của người lao động trong điều kiện lao động bình thường được điều chỉnh theo lộ trình cho đến khi đủ 62 tuổi đối với lao động nam vào năm 2028 và đủ 60 tuổi đối với lao động nữ vào năm 2035.",
+}
+
+# Present in every case: a generic entity that matches most passages
+GENERIC_TRIPLE = ("Người lao động", "THEO", "Bộ luật Lao động")
+
+# (question, relevant Điều, graph triples)
+LABELLED_QUESTIONS = [
+    ("Thời gian thử việc tối đa là bao lâu?", "Điều 25",
+     [("Thử việc", "TỐI_ĐA", "180 ngày")]),
+    ("Lương thử việc được trả ít nhất bao nhiêu phần trăm?", "Điều 26",
+     [("Tiền lương thử việc", "ÍT_NHẤT", "85%")]),
+    ("Tôi muốn nghỉ việc thì phải báo trước bao nhiêu ngày?", "Điều 35",
+     [("Người lao động", "ĐƠN_PHƯƠNG_CHẤM_DỨT", "báo trước"), ("báo trước", "ÍT_NHẤT", "45 ngày")]),
+    ("Làm việc 3 năm thì được trợ cấp thôi việc thế nào?", "Điều 46",
+     [("Trợ cấp thôi việc", "MỖI_NĂM", "một nửa tháng tiền lương")]),
+    ("Làm thêm giờ vào ngày nghỉ lễ được trả lương bao nhiêu?", "Điều 98",
+     [("Tiền lương làm thêm giờ", "NGÀY_NGHỈ_LỄ", "300%")]),
+    ("Một tuần làm việc tối đa bao nhiêu giờ?", "Điều 105",
+     [("Thời giờ làm việc bình thường", "TỐI_ĐA", "48 giờ trong 01 tuần")]),
+    ("Số giờ làm thêm tối đa trong một tháng là bao nhiêu?", "Điều 107",
+     [("Làm thêm giờ", "TỐI_ĐA", "40 giờ trong 01 tháng")]),
+    ("Làm ca đêm được nghỉ giữa giờ bao nhiêu phút?", "Điều 109",
+     [("Nghỉ giữa giờ", "BAN_ĐÊM", "45 phút")]),
+    ("Tết Âm lịch người lao động được nghỉ mấy ngày?", "Điều 112",
+     [("Tết Âm lịch", "NGHỈ", "05 ngày")]),
+    ("Người lao động được nghỉ phép năm bao nhiêu ngày?", "Điều 113",
+     [("Nghỉ phép năm", "LÀ", "Nghỉ hằng năm"), ("Nghỉ hằng năm", "ĐIỀU_KIỆN_BÌNH_THƯỜNG", "12 ngày làm việc")]),
+    ("Công ty có những hình thức kỷ luật lao động nào?", "Điều 125",
+     [("Kỷ luật lao động", "HÌNH_THỨC", "sa thải"), ("Kỷ luật lao động", "HÌNH_THỨC", "cách chức")]),
+    ("Lao động nữ được nghỉ thai sản bao lâu?", "Điều 139",
+     [("Nghỉ thai sản", "THỜI_GIAN", "06 tháng")]),
+]
+
+# Paraphrases with little word overlap with their Điều
+HARD_QUESTIONS = [
+    ("Sếp bắt tôi ở lại công ty tới 11 giờ khuya thì có tính là ca đêm không?", "Điều 106",
+     [("Giờ làm việc ban đêm", "TỪ", "22 giờ"), ("Giờ làm việc ban đêm", "ĐẾN", "06 giờ sáng")]),
+    ("Đang bầu 7 tháng công ty có được bắt đi công tác tỉnh khác?", "Điều 137",
+     [("Lao động nữ mang thai", "KHÔNG_ĐƯỢC", "đi công tác xa"), ("Bảo vệ thai sản", "TỪ", "tháng thứ 07")]),
+    ("Tôi làm vỡ máy của công ty thì bị trừ bao nhiêu?", "Điều 129",
+     [("hư hỏng dụng cụ, thiết bị", "DẪN_ĐẾN", "Bồi thường thiệt hại"),
+      ("Bồi thường thiệt hại", "NHIỀU_NHẤT", "03 tháng tiền lương")]),
+    ("Em trai tôi 16 tuổi có được đi làm không?", "Điều 143",
+     [("Lao động chưa thành niên", "LÀ", "chưa đủ 18 tuổi")]),
+    ("Bao nhiêu tuổi thì được về hưu?", "Điều 169",
+     [("Tuổi nghỉ hưu", "NAM", "62 tuổi"), ("Tuổi nghỉ hưu", "NỮ", "60 tuổi")]),
+    ("Cưới vợ thì được nghỉ mấy hôm?", "Điều 115",
+     [("Cưới", "LÀ", "Kết hôn"), ("Nghỉ việc riêng", "BAO_GỒM", "Kết hôn")]),
+    ("Công ty trả tiền vào lúc nào trong tháng?", "Điều 97",
+     [("Kỳ hạn trả lương", "THEO", "nửa tháng một lần")]),
+    ("Bị đình chỉ để điều tra thì có được nhận tiền không?", "Điều 128",
+     [("Tạm đình chỉ công việc", "TẠM_ỨNG", "50% tiền lương")]),
+    ("Chủ nhật có bắt buộc phải cho nghỉ không?", "Điều 111",
+     [("Nghỉ hằng tuần", "ÍT_NHẤT", "24 giờ liên tục")]),
+    ("Ký hợp đồng miệng có hợp lệ không?", "Điều 14",
+     [("Hợp đồng miệng", "LÀ", "lời nói"), ("lời nói", "ÁP_DỤNG", "dưới 01 tháng")]),
+    ("Công ty được phép trả thấp nhất là bao nhiêu?", "Điều 91",
+     [("Mức lương tối thiểu", "LÀ", "mức lương thấp nhất")]),
+    ("Công ty có quyền đuổi người ốm dài ngày không?", "Điều 36",
+     [("Người sử dụng lao động", "ĐƠN_PHƯƠNG_CHẤM_DỨT", "ốm đau"), ("ốm đau", "ĐIỀU_TRỊ", "12 tháng liên tục")]),
+]
+
+
+def tfidf_scores(question, ids):
+    """TF-IDF cosine similarity of the question to each passage, over single syllables"""
+    docs = [[t for t in tokenize(PASSAGES[i]) if " " not in t] for i in ids]
+    vocabulary = {term: n for n, term in enumerate(sorted({t for doc in docs for t in doc}))}
+    matrix = np.zeros((len(docs), len(vocabulary)))
+    for row, doc in enumerate(docs):
+        for term in doc:
+            matrix[row, vocabulary[term]] += 1
+    idf = np.log((1 + len(docs)) / (1 + np.count_nonzero(matrix, axis=0))) + 1
+    matrix *= idf
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+
+    query = np.zeros(len(vocabulary))
+    for term in tokenize(question):
+        if term in vocabulary:
+            query[vocabulary[term]] += 1
+    return matrix @ (query * idf)
+
+
+def candidate_pool(question, relevant):
+    """The RERANK_FETCH_K passages closest to the question, in vector-stand-in order"""
+    ids = list(PASSAGES)
+    scores = tfidf_scores(question, ids)
+    pool = [ids[i] for i in np.argsort(-scores, kind="stable")[:RERANK_FETCH_K]]
+    if relevant not in pool:
+        pool[-1] = relevant
+    return pool
+
+
+def run(rounds: int, top_n: int = RETRIEVAL_K):
+    cases = [(q, r, t, "easy") for q, r, t in LABELLED_QUESTIONS]
+    cases += [(q, r, t, "hard") for q, r, t in HARD_QUESTIONS]
+    variants = ("vector order", "reranked", "reranked + graph")
+    # hits[subset][variant] = [recall@1 hits, recall@top_n hits]
+    hits = {subset: {variant: [0, 0] for variant in variants} for subset in ("easy", "hard")}
+    latencies = []
+
+    for question, relevant, triples, subset in cases:
+        pool = candidate_pool(question, relevant)
+        passages = [PASSAGES[i] for i in pool]
+        entities = {entity for source, _, target in triples + [GENERIC_TRIPLE]
+                    for entity in (source, target)}
+
+        rankings = {
+            "vector order": list(range(len(pool))),
+            "reranked": rerank(question, passages, top_n),
+        }
+        start = time.perf_counter()
+        for _ in range(rounds):
+            rankings["reranked + graph"] = rerank(question, passages, top_n, entities)
+        latencies.append((time.perf_counter() - start) * 1000 / rounds)
+
+        for variant, order in rankings.items():
+            ranked = [pool[i] for i in order]
+            hits[subset][variant][0] += ranked[0] == relevant
+            hits[subset][variant][1] += relevant in ranked[:top_n]
+
+    latencies.sort()
+    print(f"candidates per question: {RERANK_FETCH_K} (of {len(PASSAGES)} passages), top_n: {top_n}")
+    print("vector order is simulated with TF-IDF (no embeddings offline); see module docstring")
+    for subset, counts in (("easy", len(LABELLED_QUESTIONS)), ("hard", len(HARD_QUESTIONS))):
+        for variant in variants:
+            at_1, at_n = hits[subset][variant]
+            print(f"{subset} ({counts}) {variant:<17} recall@1: {at_1 / counts:.2f}, "
+                  f"recall@{top_n}: {at_n / counts:.2f}")
+    print(f"latency (with graph) p50: {latencies[len(latencies) // 2]:.3f} ms, "
+          f"max: {latencies[-1]:.3f} ms")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
@@ -5,20 +5,25 @@ import logging
 # Load environment variables from .env file
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),  # Output to console
-        logging.FileHandler("app.log")  # Output to file
-    ]
-)
-
 # Database settings
 NEO4J_URI = os.getenv("NEO4J_URI", "neo4j+s://1704bf0f.databases.neo4j.io")
 NEO4J_USERNAME = os.getenv("NEO4J_USERNAME", "neo4j")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "")
+NEO4J_DATABASE = os.getenv("NEO4J_DATABASE", "neo4j")
+
+# Neo4j driver pool settings
+NEO4J_MAX_POOL_SIZE = int(os.getenv("NEO4J_MAX_POOL_SIZE", "50"))
+NEO4J_KEEP_ALIVE = os.getenv("NEO4J_KEEP_ALIVE", "True").lower() in ("true", "1", "t")
+NEO4J_MAX_CONNECTION_LIFETIME = int(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", "3000"))
+NEO4J_CONNECTION_ACQUISITION_TIMEOUT = float(os.getenv("NEO4J_CONNECTION_ACQUISITION_TIMEOUT", "30"))
+# Check idle connections before reuse; Aura drops them after a few minutes
+NEO4J_LIVENESS_CHECK_TIMEOUT = float(os.getenv("NEO4J_LIVENESS_CHECK_TIMEOUT", "60"))
+
+# Graph query cache settings (see graph_store.py)
+GRAPH_CACHE_TTL = int(os.getenv("GRAPH_CACHE_TTL", "600"))
+GRAPH_CACHE_MAX_SIZE = int(os.getenv("GRAPH_CACHE_MAX_SIZE", "1024"))
+# Token required by POST /graph-cache/invalidate; the endpoint is disabled when empty
+GRAPH_CACHE_ADMIN_TOKEN = os.getenv("GRAPH_CACHE_ADMIN_TOKEN", "")
 
 # API keys
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
@@ -32,6 +37,43 @@ DEBUG = os.getenv("DEBUG", "False").lower() in ("true", "1", "t")
 API_PREFIX = os.getenv("API_PREFIX", "")
 PORT = int(os.getenv("PORT", "8000"))
 
+# Logging settings (see logging_config.py)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FILE = os.getenv("LOG_FILE", "app.log")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+LOG_JSON = os.getenv("LOG_JSON", "True").lower() in ("true", "1", "t")
+# Fraction of high-volume (sampled) records that are kept
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))
+
+# Adaptive retrieval settings (see retrieval_planner.py)
+# Questions with at most this many words count as short
+RETRIEVAL_SHORT_QUERY_WORDS = int(os.getenv("RETRIEVAL_SHORT_QUERY_WORDS", "12"))
+# Thresholds apply to the raw vector index similarity, which Neo4j scales from
+# cosine similarity as (1 + cos) / 2
+# Top vector score at or above which the vector hits are trusted on their own (cos 0.8)
+RETRIEVAL_HIGH_CONFIDENCE = float(os.getenv("RETRIEVAL_HIGH_CONFIDENCE", "0.9"))
+# Top vector score below which the vector hits are dropped in favour of the graph (cos 0.6)
+RETRIEVAL_LOW_CONFIDENCE = float(os.getenv("RETRIEVAL_LOW_CONFIDENCE", "0.8"))
+RETRIEVAL_K = int(os.getenv("RETRIEVAL_K", "4"))
+RETRIEVAL_K_SITUATIONAL = int(os.getenv("RETRIEVAL_K_SITUATIONAL", "8"))
+
+# Reranker settings (see reranker.py)
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "True").lower() in ("true", "1", "t")
+# Vector candidates fetched before reranking down to the plan's k
+RERANK_FETCH_K = int(os.getenv("RERANK_FETCH_K", "20"))
+RERANK_RRF_K = int(os.getenv("RERANK_RRF_K", "60"))
+BM25_K1 = float(os.getenv("BM25_K1", "1.5"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+# Prompt token budgets (see prompt_budget.py)
+TOKEN_BUDGET_CHAT_HISTORY = int(os.getenv("TOKEN_BUDGET_CHAT_HISTORY", "1500"))
+# Older turns beyond this many are truncated to TOKEN_BUDGET_OLD_TURN tokens each
+TOKEN_BUDGET_RECENT_TURNS = int(os.getenv("TOKEN_BUDGET_RECENT_TURNS", "2"))
+TOKEN_BUDGET_OLD_TURN = int(os.getenv("TOKEN_BUDGET_OLD_TURN", "120"))
+TOKEN_BUDGET_STRUCTURED = int(os.getenv("TOKEN_BUDGET_STRUCTURED", "2000"))
+TOKEN_BUDGET_UNSTRUCTURED = int(os.getenv("TOKEN_BUDGET_UNSTRUCTURED", "3000"))
+
 # Validate required environment variables
 def validate_env_vars():
     missing_vars = []
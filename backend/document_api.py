@@ -10,12 +10,7 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 import logging
 
-# Set up logging with UTF-8 encoding
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    encoding='utf-8'
-)
+# Logging is configured once in logging_config.setup_logging()
 logger = logging.getLogger(__name__)
 
 # Load environment variables
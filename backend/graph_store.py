@@ -0,0 +1,181 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from neo4j import GraphDatabase, RoutingControl
+from langchain_community.graphs import Neo4jGraph
+
+from config import (
+    NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD, NEO4J_DATABASE,
+    NEO4J_MAX_POOL_SIZE, NEO4J_KEEP_ALIVE, NEO4J_MAX_CONNECTION_LIFETIME,
+    NEO4J_CONNECTION_ACQUISITION_TIMEOUT, NEO4J_LIVENESS_CHECK_TIMEOUT,
+    GRAPH_CACHE_TTL, GRAPH_CACHE_MAX_SIZE
+)
+
+logger = logging.getLogger(__name__)
+
+# Neighbours of the entities matching a fulltext query.
+# Kept as a constant so the server reuses the cached plan for every call.
+ENTITY_NEIGHBOURS_QUERY = """CALL db.index.fulltext.queryNodes('entity', $query, {limit:5})
+YIELD node,score
+CALL {
+  WITH node
+  MATCH (node)-[r:!MENTIONS]->(neighbor)
+  RETURN node.id AS source, type(r) AS relation, neighbor.id AS target
+  UNION ALL
+  WITH node
+  MATCH (node)<-[r:!MENTIONS]-(neighbor)
+  RETURN neighbor.id AS source, type(r) AS relation, node.id AS target
+}
+RETURN source, relation, target LIMIT 50
+"""
+
+
+def build_driver_config() -> Dict[str, Any]:
+    """Neo4j driver settings for the connection pool"""
+    return {
+        "max_connection_pool_size": NEO4J_MAX_POOL_SIZE,
+        "keep_alive": NEO4J_KEEP_ALIVE,
+        "max_connection_lifetime": NEO4J_MAX_CONNECTION_LIFETIME,
+        "connection_acquisition_timeout": NEO4J_CONNECTION_ACQUISITION_TIMEOUT,
+        "liveness_check_timeout": NEO4J_LIVENESS_CHECK_TIMEOUT,
+    }
+
+
+def build_vector_graph() -> Neo4jGraph:
+    """
+    Neo4jGraph for the Neo4jVector stores (passed as their `graph`), so the
+    per-request vector searches share one driver with the tuned pool settings
+    instead of each store opening a default driver.
+    """
+    return Neo4jGraph(
+        url=NEO4J_URI,
+        username=NEO4J_USERNAME,
+        password=NEO4J_PASSWORD,
+        database=NEO4J_DATABASE,
+        driver_config=build_driver_config(),
+        refresh_schema=False,
+    )
+
+
+class QueryCache:
+    """
+    Thread-safe LRU cache of query results with TTL.
+
+    Entries are tagged with the cache version; invalidate() bumps the version
+    so every older entry becomes stale at once.
+    """
+
+    def __init__(self, ttl: int = GRAPH_CACHE_TTL, max_size: int = GRAPH_CACHE_MAX_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(query: str, params: Optional[Dict[str, Any]]) -> str:
+        return query + "\0" + json.dumps(params or {}, sort_keys=True, ensure_ascii=False)
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                version, expires_at, value = entry
+                if version == self.version and expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value, version: int):
+        """
+        Store a result read under the given cache version.
+        Results read before an invalidate() are dropped.
+        """
+        with self._lock:
+            if version != self.version:
+                return
+            self._entries[key] = (self.version, time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        """Drop every cached result, e.g. after the graph has been re-imported"""
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "version": self.version,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class GraphStore:
+    """
+    Access layer for graph lookups on the retrieval path.
+
+    Read queries are routed to read replicas and their results are cached
+    keyed on (Cypher, params).
+    """
+
+    def __init__(self, cache: Optional[QueryCache] = None):
+        self.driver = GraphDatabase.driver(
+            NEO4J_URI, auth=(NEO4J_USERNAME, NEO4J_PASSWORD), **build_driver_config()
+        )
+        self.cache = cache or QueryCache()
+
+    def query(self, query: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Run a write or schema query on the leader, bypassing the cache"""
+        records, _, _ = self.driver.execute_query(
+            query,
+            params or {},
+            database_=NEO4J_DATABASE,
+            routing_=RoutingControl.WRITE,
+        )
+        return [record.data() for record in records]
+
+    def read_query(self, query: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Run a read-only query on a read replica, using cached results when available"""
+        key = QueryCache.make_key(query, params)
+        cached = self.cache.get(key)
+        if cached is not None:
+            # Copy the rows so callers cannot mutate the shared cached result
+            return [dict(row) for row in cached]
+
+        # Taken before the query so that an invalidate() during it discards the result
+        version = self.cache.version
+        records, _, _ = self.driver.execute_query(
+            query,
+            params or {},
+            database_=NEO4J_DATABASE,
+            routing_=RoutingControl.READ,
+        )
+        result = [record.data() for record in records]
+        self.cache.set(key, [dict(row) for row in result], version)
+        return result
+
+    def entity_neighbours(self, full_text_query: str) -> List[Tuple[str, str, str]]:
+        """Relationships around the entities matching a fulltext query, as (source, relation, target)"""
+        response = self.read_query(ENTITY_NEIGHBOURS_QUERY, {"query": full_text_query})
+        return [(el['source'], el['relation'], el['target']) for el in response]
+
+    def invalidate_cache(self):
+        self.cache.invalidate()
+        logger.info(f"Graph query cache invalidated, version={self.cache.version}")
+
+    def close(self):
+        self.driver.close()
@@ -0,0 +1,153 @@
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from config import (
+    LOG_LEVEL, LOG_FILE, LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_JSON, LOG_SAMPLE_RATE
+)
+
+# Request id of the request currently being handled (set by the middleware in main.py)
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+# Stage timings collected for the current request
+stage_timings_var: ContextVar[dict] = ContextVar("stage_timings", default=None)
+
+# Counters (e.g. tokens saved) collected for the current request
+request_metrics_var: ContextVar[dict] = ContextVar("request_metrics", default=None)
+
+_listener = None
+
+
+def new_request_id() -> str:
+    """Generate a short request id"""
+    return uuid.uuid4().hex[:12]
+
+
+class RequestQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves all formatting to the listener thread.
+
+    The stock prepare() formats the message and traceback on the calling thread;
+    here the record is only tagged with the current request id and enqueued as is.
+    """
+
+    def prepare(self, record):
+        record.request_id = request_id_var.get()
+        return record
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of high-volume records.
+
+    Records opt in with `extra={"sampled": True}`; warnings and errors are always kept.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if not getattr(record, "sampled", False) or record.levelno >= logging.WARNING:
+            return True
+        return random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line"""
+
+    def format(self, record):
+        payload = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        for key in ("stage", "duration_ms", "timings", "metrics"):
+            value = getattr(record, key, None)
+            if value is not None:
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False)
+
+
+def setup_logging():
+    """
+    Configure the root logger once for the whole application.
+
+    Records are pushed onto an in-memory queue from the request thread and written to
+    the console and a size-rotated file by a background QueueListener thread.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    if LOG_JSON:
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(
+            '%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s'
+        )
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+    file_handler = logging.handlers.RotatingFileHandler(
+        LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8'
+    )
+    file_handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = RequestQueueHandler(log_queue)
+    # Dropped records are never formatted, so sampled call sites should pass %s arguments
+    queue_handler.addFilter(SamplingFilter(LOG_SAMPLE_RATE))
+
+    root = logging.getLogger()
+    root.handlers.clear()
+    root.addHandler(queue_handler)
+    root.setLevel(LOG_LEVEL)
+
+    _listener = logging.handlers.QueueListener(
+        log_queue, stream_handler, file_handler, respect_handler_level=True
+    )
+    _listener.start()
+
+    logging.getLogger("neo4j.notifications").setLevel(logging.ERROR)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+@contextmanager
+def log_stage(logger: logging.Logger, stage: str):
+    """Time a pipeline stage and record its duration for the current request"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration_ms = round((time.perf_counter() - start) * 1000, 2)
+        timings = stage_timings_var.get()
+        if timings is not None:
+            timings[stage] = duration_ms
+        logger.debug("Stage %s took %sms", stage, duration_ms,
+                     extra={"stage": stage, "duration_ms": duration_ms})
+
+
+def record_metric(name: str, value):
+    """Add a value to a counter of the current request"""
+    metrics = request_metrics_var.get()
+    if metrics is not None:
+        metrics[name] = metrics.get(name, 0) + value
@@ -1,18 +1,21 @@
 import os
 from typing import List, Dict, Optional, Any
 import re
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, Header, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 import uvicorn
 from functools import lru_cache
 import time
+import secrets
 
 # Import configurations
 from config import (
     validate_env_vars, NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD,
-    GEMINI_API_KEY, GEMINI_MODEL, GEMINI_EMBEDDING_MODEL, DEBUG, PORT
+    GEMINI_API_KEY, GEMINI_MODEL, GEMINI_EMBEDDING_MODEL, DEBUG, PORT, GRAPH_CACHE_ADMIN_TOKEN,
+    RETRIEVAL_K, TOKEN_BUDGET_STRUCTURED,
+    TOKEN_BUDGET_UNSTRUCTURED, RERANK_ENABLED, RERANK_FETCH_K
 )
 
 # Import necessary langchain components
@@ -27,28 +30,31 @@ from langchain_core.pydantic_v1 import BaseModel as LCBaseModel, Field
 from typing import Tuple, List, Optional
 from langchain_core.messages import AIMessage, HumanMessage
 from langchain_core.output_parsers import StrOutputParser
-from langchain_community.graphs import Neo4jGraph
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_experimental.graph_transformers import LLMGraphTransformer
 from langchain_community.vectorstores import Neo4jVector
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 import logging
-import sys
 
 # Import document API router
 from document_api import router as document_router
-
-# Set up logging with UTF-8
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('app.log', encoding='utf-8')
-    ]
+from logging_config import (
+    setup_logging, shutdown_logging, log_stage, new_request_id,
+    request_id_var, stage_timings_var, request_metrics_var, record_metric
+)
+from graph_store import GraphStore, build_vector_graph
+from prompt_budget import (
+    compact_chat_history, compact_triples, compact_documents, enforce_budget,
+    record_tokens_saved, count_tokens_saved, compactions_var
+)
+from reranker import rerank
+from retrieval_planner import (
+    VECTOR_ONLY, GRAPH_ONLY, HYBRID, should_short_circuit, plan_retrieval
 )
+
+# Set up queue-based structured logging
+setup_logging()
 logger = logging.getLogger(__name__)
-logging.getLogger("neo4j.notifications").setLevel(logging.ERROR)
 
 # FastAPI app
 app = FastAPI(
@@ -67,12 +73,34 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def request_context_middleware(request: Request, call_next):
+    """Assign a request id and collect stage timings and metrics for each request"""
+    request_id = request.headers.get("X-Request-ID") or new_request_id()
+    id_token = request_id_var.set(request_id)
+    timings = {}
+    timings_token = stage_timings_var.set(timings)
+    metrics = {}
+    metrics_token = request_metrics_var.set(metrics)
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = request_id
+        return response
+    finally:
+        timings["total"] = round((time.perf_counter() - start) * 1000, 2)
+        logger.info("%s %s completed", request.method, request.url.path, extra={"timings": timings, "metrics": metrics})
+        request_metrics_var.reset(metrics_token)
+        stage_timings_var.reset(timings_token)
+        request_id_var.reset(id_token)
+
 # Include document API router
 app.include_router(document_router, prefix="/api/documents", tags=["documents"])
 
 # Connect to Neo4j
 graph = None
 vector_index = None
+vector_score_index = None
 llm = None
 chain = None
 
@@ -91,6 +119,7 @@ class ChatRequest(BaseModel):
 class ChatResponse(BaseModel):
     answer: str
     processing_time: float = 0.0
+    tokens_saved: int = 0
 
 class ErrorResponse(BaseModel):
     detail: str
@@ -116,10 +145,10 @@ class Entities(LCBaseModel):
     )
 
 def initialize_components():
-    global graph, vector_index, llm, chain
+    global graph, vector_index, vector_score_index, llm, chain
 
-    # Initialize Neo4j Graph
-    graph = Neo4jGraph()
+    # Initialize Neo4j Graph with a tuned pool and cached read queries
+    graph = GraphStore()
 
     # Initialize LLM
     llm = ChatGoogleGenerativeAI(
@@ -139,15 +168,28 @@ def initialize_components():
         google_api_key=GEMINI_API_KEY
     )
 
+    # Both vector stores share one driver with the tuned pool settings
+    vector_graph = build_vector_graph()
+
     # Connect Neo4j Vector from existing graph
     vector_index = Neo4jVector.from_existing_graph(
         embedding=embedding,
+        graph=vector_graph,
         search_type="hybrid",
         node_label="Document",
         text_node_properties=["text"],
         embedding_node_property="embedding"
     )
 
+    # Vector-only view of the same index. Hybrid search divides scores by the best
+    # hit, so the retrieval planner needs the raw similarity from this one.
+    vector_score_index = Neo4jVector.from_existing_index(
+        embedding=embedding,
+        index_name=vector_index.index_name,
+        search_type="vector",
+        graph=vector_graph,
+    )
+
     # Create fulltext index
     graph.query(
         "CREATE FULLTEXT INDEX entity IF NOT EXISTS FOR (e:__Entity__) ON EACH [e.id]")
@@ -215,7 +257,7 @@ def setup_chain():
     # Format chat history
     def _format_chat_history(chat_history: List[Tuple[str, str]]) -> List:
         buffer = []
-        for human, ai in chat_history:
+        for human, ai in compact_chat_history(chat_history):
             buffer.append(HumanMessage(content=human))
             buffer.append(AIMessage(content=ai))
         return buffer
@@ -286,12 +328,12 @@ def setup_chain():
 
         return full_text_query.strip()
 
-    def structured_retriever(question: str, analysis=None) -> str:
+    def structured_retriever(question: str, analysis=None) -> List[Tuple[str, str, str]]:
         """
         Retrieve information about entities mentioned in the question 
-        and adjacent nodes in the knowledge graph
+        and adjacent nodes in the knowledge graph, as (source, relation, target) triples
         """
-        result = ""
+        result = []
 
         # Use analysis if available
         if analysis:
@@ -320,47 +362,83 @@ def setup_chain():
         all_entities = list(set(all_entities + additional_entities))
 
         for entity in all_entities:
-            response = graph.query(
-                """CALL db.index.fulltext.queryNodes('entity', $query, {limit:5})
-                YIELD node,score
-                CALL {
-                  WITH node
-                  MATCH (node)-[r:!MENTIONS]->(neighbor)
-                  RETURN node.id + ' - ' + type(r) + ' -> ' + neighbor.id AS output
-                  UNION ALL
-                  WITH node
-                  MATCH (node)<-[r:!MENTIONS]-(neighbor)
-                  RETURN neighbor.id + ' - ' + type(r) + ' -> ' +  node.id AS output
-                }
-                RETURN output LIMIT 50
-                """,
-                {"query": generate_full_text_query(entity)},
-            )
-            result += "\n".join([el['output'] for el in response])
+            response = graph.entity_neighbours(generate_full_text_query(entity))
+            result.extend(response)
         return result
 
     def enhanced_retriever(question: str):
-        """Enhanced retriever - NO factual questions generation"""
-        logger.info(f"Search query: {question[:100]}...")
-
-        # Analyze question with Gemini - ONLY for situational detection and key concepts
-        analysis = question_analyzer.invoke({"question": question})
-        logger.info(f"Question analysis: situational={analysis.is_situational}, concepts={analysis.key_legal_concepts}")
+        """Enhanced retriever - picks vector, graph or hybrid retrieval per question"""
+        logger.info("Search query: %.100s...", question, extra={"sampled": True})
+        plan_start = time.perf_counter()
+
+        # Embed once; the raw top vector similarity drives the retrieval plan
+        with log_stage(logger, "vector_search"):
+            question_embedding = vector_index.embedding.embed_query(question)
+            top_hits = vector_score_index.similarity_search_with_score_by_vector(question_embedding, k=1)
+        top_score = top_hits[0][1] if top_hits else None
+
+        analysis = None
+        if should_short_circuit(question, top_score):
+            # Short question with a high-confidence hit - skip analysis and graph retrieval
+            plan, k = VECTOR_ONLY, RETRIEVAL_K
+        else:
+            # Analyze question with Gemini - ONLY for situational detection and key concepts
+            with log_stage(logger, "analysis"):
+                analysis = question_analyzer.invoke({"question": question})
+            logger.info("Question analysis: situational=%s, concepts=%s",
+                        analysis.is_situational, analysis.key_legal_concepts, extra={"sampled": True})
+            plan, k = plan_retrieval(question, analysis.is_situational, top_score)
+
+        # Hybrid candidates, over-fetched for the reranker; graph-only plans need none
+        docs = []
+        if k:
+            with log_stage(logger, "candidate_search"):
+                docs = vector_index.similarity_search_by_vector(
+                    question_embedding, k=max(RERANK_FETCH_K, k) if RERANK_ENABLED else k, query=question
+                )
 
         # Structured query with analysis information
-        structured_data = structured_retriever(question, analysis)
-
-        # Vector search for the original question ONLY
-        unstructured_data = [el.page_content for el in vector_index.similarity_search(question)]
-
-        # NO additional searches for factual questions - this was the bottleneck!
-
-        final_data = f"""Câu hỏi gốc: {question}
+        triples = []
+        if plan in (GRAPH_ONLY, HYBRID):
+            with log_stage(logger, "structured_retrieval"):
+                triples = structured_retriever(question, analysis)
+
+        # Keep the prompt within the per-stage token budgets
+        raw_structured_data = "\n".join(
+            f"{source} - {relation} -> {target}" for source, relation, target in triples
+        )
+        structured_data = compact_triples(raw_structured_data)
+        record_tokens_saved("structured", raw_structured_data, structured_data)
+        structured_data = enforce_budget(
+            structured_data, TOKEN_BUDGET_STRUCTURED, "structured", by_lines=True
+        )
 
+        # Rerank the over-fetched candidates and keep the top k
+        candidates = [doc.page_content for doc in docs]
+        if RERANK_ENABLED and k and candidates:
+            with log_stage(logger, "rerank"):
+                rerank_query = question
+                if analysis:
+                    rerank_query += " " + " ".join(analysis.key_legal_concepts)
+                graph_entities = {entity for source, _, target in triples for entity in (source, target)}
+                candidates = [candidates[i] for i in rerank(rerank_query, candidates, k, graph_entities)]
+        unstructured_data = compact_documents(candidates[:k], TOKEN_BUDGET_UNSTRUCTURED)
+
+        plan_ms = round((time.perf_counter() - plan_start) * 1000, 2)
+        logger.info("Retrieval plan: %s, k=%s, top_score=%s, took %sms", plan, k, top_score, plan_ms,
+                    extra={"stage": "retrieval", "duration_ms": plan_ms})
+
+        # Short-circuited questions are not analysed, so leave the section out
+        analysis_data = ""
+        if analysis:
+            analysis_data = f"""
 Phân tích:
 - Câu hỏi tình huống: {"Có" if analysis.is_situational else "Không"}
 - Khái niệm pháp lý liên quan: {", ".join(analysis.key_legal_concepts)}
+"""
 
+        final_data = f"""Câu hỏi gốc: {question}
+{analysis_data}
 Dữ liệu có cấu trúc:
 {structured_data}
 
@@ -466,6 +544,13 @@ async def startup_event():
     except Exception as e:
         logger.error(f"Error initializing components: {str(e)}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close the Neo4j driver and flush pending log records on shutdown"""
+    if graph is not None:
+        graph.close()
+    shutdown_logging()
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -491,9 +576,31 @@ async def system_info():
         "neo4j_connected": graph is not None,
         "vector_search_enabled": vector_index is not None,
         "llm_model": GEMINI_MODEL,
-        "embedding_model": GEMINI_EMBEDDING_MODEL
+        "embedding_model": GEMINI_EMBEDDING_MODEL,
+        "graph_cache": graph.cache.stats() if graph is not None else None
     }
 
+def verify_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """Check the admin token sent in the X-Admin-Token header"""
+    if not GRAPH_CACHE_ADMIN_TOKEN or not x_admin_token or not secrets.compare_digest(
+        x_admin_token, GRAPH_CACHE_ADMIN_TOKEN
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid admin token"
+        )
+
+@app.post("/graph-cache/invalidate", dependencies=[Depends(verify_admin_token)])
+async def invalidate_graph_cache():
+    """Invalidate cached graph query results, e.g. after re-importing the graph"""
+    if graph is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Graph is not initialized"
+        )
+    graph.invalidate_cache()
+    return graph.cache.stats()
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
     """Chat with the legal advisor bot"""
@@ -506,11 +613,27 @@ async def chat(request: ChatRequest):
                 detail="Question cannot be empty"
             )
             
-        answer = chain.invoke({"question": request.question, "chat_history": request.chat_history})
-        
-        processing_time = time.time() - start_time
+        compactions_token = compactions_var.set([])
+        try:
+            answer = chain.invoke({"question": request.question, "chat_history": request.chat_history})
+            
+            processing_time = time.time() - start_time
+            
+            # Count with the Gemini tokenizer; the budgeting estimate is only a fallback
+            try:
+                tokens_saved = count_tokens_saved(llm.get_num_tokens)
+            except Exception as e:
+                logger.warning("Could not count tokens saved: %s", e)
+                tokens_saved = (request_metrics_var.get() or {}).get("estimated_tokens_saved", 0)
+            record_metric("tokens_saved", tokens_saved)
+        finally:
+            compactions_var.reset(compactions_token)
         
-        return ChatResponse(answer=answer, processing_time=processing_time)
+        return ChatResponse(
+            answer=answer,
+            processing_time=processing_time,
+            tokens_saved=tokens_saved
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -0,0 +1,204 @@
+import re
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Callable, List, Tuple
+
+from config import (
+    TOKEN_BUDGET_CHAT_HISTORY, TOKEN_BUDGET_RECENT_TURNS, TOKEN_BUDGET_OLD_TURN
+)
+from logging_config import record_metric
+
+# Words and standalone punctuation marks
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+# "X - REL -> Y" lines produced by the graph neighbour query
+_TRIPLE_PATTERN = re.compile(r"^(.+?) - (\S+) -> (.+)$")
+
+TRUNCATION_MARK = " ..."
+
+# (before, after) texts of every compaction in the current request, used to count
+# the tokens saved with the model's own tokenizer (set by the /chat endpoint)
+compactions_var: ContextVar[list] = ContextVar("compactions", default=None)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in a Vietnamese text.
+
+    Vietnamese is written as short syllables separated by spaces. ASCII syllables
+    are usually a single token while syllables with diacritics are often split in
+    two, so they are weighted higher. Punctuation marks count as one token each.
+
+    The weights have not been checked against the Gemini tokenizer, so this is
+    only used to enforce budgets; reported savings use count_tokens_saved().
+    """
+    tokens = 0.0
+    for match in _TOKEN_PATTERN.findall(text):
+        tokens += 1.0 if match.isascii() else 1.5
+    return int(tokens + 0.5)
+
+
+def truncate_to_budget(text: str, budget: int) -> str:
+    """
+    Cut the text at a word boundary so that it fits in the token budget.
+    Returns an empty string when not even one word and the truncation mark fit.
+    """
+    budget = max(budget, 0)
+    if estimate_tokens(text) <= budget:
+        return text
+
+    words = text.split()
+    budget -= estimate_tokens(TRUNCATION_MARK)
+    if budget <= 0:
+        return ""
+    # Binary search the longest prefix of words that fits
+    low, high = 0, len(words)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if estimate_tokens(" ".join(words[:mid])) <= budget:
+            low = mid
+        else:
+            high = mid - 1
+    if low == 0:
+        return ""
+    return " ".join(words[:low]) + TRUNCATION_MARK
+
+
+def truncate_lines_to_budget(text: str, budget: int) -> str:
+    """Keep whole lines from the start of the text while they fit in the token budget"""
+    kept = []
+    used = 0
+    for line in text.splitlines():
+        cost = estimate_tokens(line)
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(kept)
+
+
+def enforce_budget(text: str, budget: int, stage: str, by_lines: bool = False) -> str:
+    """
+    Truncate the text to the budget and record the tokens saved for the stage.
+    Line-oriented text such as graph triples is cut between lines, prose between words.
+    """
+    if estimate_tokens(text) <= budget:
+        return text
+    if by_lines:
+        compacted = truncate_lines_to_budget(text, budget)
+    else:
+        compacted = truncate_to_budget(text, budget)
+    record_tokens_saved(stage, text, compacted)
+    return compacted
+
+
+def record_tokens_saved(stage: str, before: str, after: str):
+    """Record a compaction: estimated savings as a metric, the texts for exact counting"""
+    saved = max(estimate_tokens(before) - estimate_tokens(after), 0)
+    if not saved:
+        return
+    record_metric("estimated_tokens_saved", saved)
+    record_metric(f"estimated_tokens_saved_{stage}", saved)
+    compactions = compactions_var.get()
+    if compactions is not None:
+        compactions.append((before, after))
+
+
+def count_tokens_saved(count_tokens: Callable[[str], int]) -> int:
+    """
+    Count the tokens saved by all compactions of the current request with the
+    given tokenizer (e.g. llm.get_num_tokens), in one call for the original
+    texts and one for the compacted texts.
+    """
+    compactions = compactions_var.get()
+    if not compactions:
+        return 0
+    before = "\n".join(before for before, _ in compactions)
+    after = "\n".join(after for _, after in compactions)
+    return max(count_tokens(before) - count_tokens(after), 0)
+
+
+def compact_chat_history(chat_history: List[Tuple[str, str]],
+                         budget: int = TOKEN_BUDGET_CHAT_HISTORY) -> List[Tuple[str, str]]:
+    """
+    Fit the chat history into the token budget.
+
+    The most recent turns are kept verbatim, older turns are truncated, and the
+    oldest turns are dropped once the budget is used up.
+    """
+    compacted = []
+    used = 0
+    for index, (human, ai) in enumerate(reversed(chat_history)):
+        if index >= TOKEN_BUDGET_RECENT_TURNS:
+            human = truncate_to_budget(human, TOKEN_BUDGET_OLD_TURN // 2)
+            ai = truncate_to_budget(ai, TOKEN_BUDGET_OLD_TURN)
+        cost = estimate_tokens(human) + estimate_tokens(ai)
+        if used + cost > budget:
+            if compacted:
+                break
+            # Always keep the latest turn, truncated if needed
+            human = truncate_to_budget(human, budget // 3)
+            ai = truncate_to_budget(ai, max(budget - estimate_tokens(human), 0))
+            cost = estimate_tokens(human) + estimate_tokens(ai)
+            if not human and not ai:
+                break
+        compacted.append((human, ai))
+        used += cost
+    compacted.reverse()
+
+    record_tokens_saved(
+        "chat_history",
+        "\n".join(f"{human}\n{ai}" for human, ai in chat_history),
+        "\n".join(f"{human}\n{ai}" for human, ai in compacted),
+    )
+    return compacted
+
+
+def compact_triples(structured_data: str) -> str:
+    """
+    Group repeated "X - REL -> Y" lines into one line per (X, REL):
+    "X - REL -> Y1; Y2; Y3". Duplicate lines are dropped and other lines are kept.
+    """
+    grouped = OrderedDict()
+    for line in structured_data.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        match = _TRIPLE_PATTERN.match(line)
+        if match:
+            source, relation, target = match.groups()
+            targets = grouped.setdefault((source, relation), [])
+        else:
+            targets = grouped.setdefault((line, None), [])
+            target = None
+        if target is not None and target not in targets:
+            targets.append(target)
+
+    lines = []
+    for (source, relation), targets in grouped.items():
+        if relation is None:
+            lines.append(source)
+        else:
+            lines.append(f"{source} - {relation} -> {'; '.join(targets)}")
+    return "\n".join(lines)
+
+
+def compact_documents(documents: List[str], budget: int) -> List[str]:
+    """Keep documents in rank order until the budget is used up, truncating the last one"""
+    kept = []
+    used = 0
+    for doc in documents:
+        cost = estimate_tokens(doc)
+        if used + cost > budget:
+            remaining = budget - used
+            # Only keep a truncated document if a useful part of it fits
+            if remaining >= 50:
+                doc = truncate_to_budget(doc, remaining)
+                kept.append(doc)
+                used += estimate_tokens(doc)
+            break
+        kept.append(doc)
+        used += cost
+
+    record_tokens_saved("unstructured", "\n".join(documents), "\n".join(kept))
+    return kept
@@ -0,0 +1,132 @@
+import re
+from collections import Counter
+from typing import Collection, List, Optional, Sequence
+
+import numpy as np
+
+from config import RERANK_RRF_K, BM25_K1, BM25_B
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split a Vietnamese text into terms.
+
+    Vietnamese words are often made of several syllables ("hợp đồng", "tiền lương"),
+    so syllable bigrams are added next to the single syllables.
+    """
+    syllables = _WORD_PATTERN.findall(text.lower())
+    bigrams = [f"{a} {b}" for a, b in zip(syllables, syllables[1:])]
+    return syllables + bigrams
+
+
+def _term_frequencies(terms_per_passage: Sequence[List[str]], vocabulary: dict):
+    """
+    Build the (passages x vocabulary) term frequency matrix in one pass.
+
+    Terms of all passages are flattened into row/column index arrays and
+    accumulated with np.add.at; terms outside the vocabulary are skipped.
+    """
+    rows = np.repeat(
+        np.arange(len(terms_per_passage)), [len(terms) for terms in terms_per_passage]
+    )
+    cols = np.fromiter(
+        (vocabulary.get(term, -1) for terms in terms_per_passage for term in terms),
+        dtype=np.int64,
+        count=len(rows),
+    )
+    known = cols >= 0
+    tf = np.zeros((len(terms_per_passage), len(vocabulary)))
+    np.add.at(tf, (rows[known], cols[known]), 1)
+    lengths = np.bincount(rows, minlength=len(terms_per_passage)).astype(float)
+    return tf, lengths
+
+
+def _idf(presence: np.ndarray) -> np.ndarray:
+    """BM25 idf of every column of a (passages x terms) presence matrix"""
+    n = presence.shape[0]
+    df = np.count_nonzero(presence, axis=0)
+    return np.log1p((n - df + 0.5) / (df + 0.5))
+
+
+def bm25_scores(query: str, passages: Sequence[str]) -> np.ndarray:
+    """
+    Score all passages against the query with BM25 in one batch.
+
+    Only the query terms matter for BM25, so the passages are reduced to a
+    (passages x query terms) frequency matrix and scored with array operations.
+    """
+    query_terms = list(dict.fromkeys(tokenize(query)))
+    if not passages or not query_terms:
+        return np.zeros(len(passages))
+
+    vocabulary = {term: i for i, term in enumerate(query_terms)}
+    tf, lengths = _term_frequencies([tokenize(passage) for passage in passages], vocabulary)
+
+    idf = _idf(tf)
+    avg_length = max(lengths.mean(), 1.0)
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / avg_length)
+    return ((tf * (BM25_K1 + 1)) / (tf + norm[:, None])) @ idf
+
+
+def graph_scores(entities: Collection[str], passages: Sequence[str]) -> np.ndarray:
+    """
+    Score passages by the graph entities they mention, weighted by idf.
+
+    Entities are matched as whole syllable sequences, and generic entities such
+    as "lao động" that appear in most passages get a weight close to zero.
+    """
+    phrases = list(dict.fromkeys(
+        " ".join(_WORD_PATTERN.findall(str(entity).lower())) for entity in entities
+    ))
+    phrases = [phrase for phrase in phrases if phrase]
+    if not phrases or not passages:
+        return np.zeros(len(passages))
+
+    # One alternation per call; longest phrases first so they win over their prefixes
+    phrases.sort(key=len, reverse=True)
+    pattern = re.compile(
+        r"(?<!\w)(" + "|".join(re.escape(phrase) for phrase in phrases) + r")(?!\w)"
+    )
+    vocabulary = {phrase: i for i, phrase in enumerate(phrases)}
+    matches = [
+        pattern.findall(" ".join(_WORD_PATTERN.findall(passage.lower())))
+        for passage in passages
+    ]
+    presence, _ = _term_frequencies(matches, vocabulary)
+    presence = np.minimum(presence, 1)
+    return presence @ _idf(presence)
+
+
+def _ranks(scores: np.ndarray) -> np.ndarray:
+    """1-based rank of every item, highest score first"""
+    order = np.argsort(-scores, kind="stable")
+    ranks = np.empty(len(scores))
+    ranks[order] = np.arange(1, len(scores) + 1)
+    return ranks
+
+
+def rerank(query: str, passages: Sequence[str], top_n: int,
+           entities: Optional[Collection[str]] = None) -> List[int]:
+    """
+    Rerank over-fetched vector candidates with reciprocal rank fusion.
+
+    Fuses the vector ranking (the order of the passages), a BM25 ranking and,
+    if graph entity ids are given, a ranking by the graph entities each passage
+    mentions. Returns the indices of the top_n passages, best first.
+    """
+    if not passages:
+        return []
+
+    vector_ranks = np.arange(1, len(passages) + 1, dtype=float)
+    fused = 1.0 / (RERANK_RRF_K + vector_ranks)
+    fused += 1.0 / (RERANK_RRF_K + _ranks(bm25_scores(query, passages)))
+
+    if entities:
+        scores = graph_scores(entities, passages)
+        if scores.any():
+            fused += 1.0 / (RERANK_RRF_K + _ranks(scores))
+
+    order = np.argsort(-fused, kind="stable")
+    return order[:top_n].tolist()
@@ -0,0 +1,47 @@
+from typing import Optional, Tuple
+
+from config import (
+    RETRIEVAL_SHORT_QUERY_WORDS, RETRIEVAL_HIGH_CONFIDENCE, RETRIEVAL_LOW_CONFIDENCE,
+    RETRIEVAL_K, RETRIEVAL_K_SITUATIONAL
+)
+
+# Retrieval plans
+VECTOR_ONLY = "vector_only"
+GRAPH_ONLY = "graph_only"
+HYBRID = "hybrid"
+
+
+def is_short_query(question: str) -> bool:
+    """Check if the question is short enough to be answered from vector hits alone"""
+    return len(question.split()) <= RETRIEVAL_SHORT_QUERY_WORDS
+
+
+def should_short_circuit(question: str, top_score: Optional[float]) -> bool:
+    """
+    Check if a short question has a high-confidence vector hit,
+    in which case question analysis and graph retrieval are skipped
+    """
+    return (
+        top_score is not None
+        and top_score >= RETRIEVAL_HIGH_CONFIDENCE
+        and is_short_query(question)
+    )
+
+
+def plan_retrieval(question: str, is_situational: bool, top_score: Optional[float]) -> Tuple[str, int]:
+    """
+    Pick the retrieval plan and the number of vector documents to keep.
+    top_score is the raw vector similarity of the best hit, not a hybrid score.
+
+    - Situational questions: hybrid with a larger k
+    - No usable vector hit: graph only
+    - Confident vector hit: vector only
+    - Otherwise: hybrid with the default k
+    """
+    if is_situational:
+        return HYBRID, RETRIEVAL_K_SITUATIONAL
+    if top_score is None or top_score < RETRIEVAL_LOW_CONFIDENCE:
+        return GRAPH_ONLY, 0
+    if top_score >= RETRIEVAL_HIGH_CONFIDENCE:
+        return VECTOR_ONLY, RETRIEVAL_K
+    return HYBRID, RETRIEVAL_K